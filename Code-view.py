@@ -1,443 +1,86 @@
 
-import ast
 import os
-import graphviz
 import sys
-import subprocess # For opening files
-import collections # For defaultdict
+import threading
+import time
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton,
     QLabel, QFileDialog, QTextEdit, QMessageBox,
     QHBoxLayout, QComboBox, QMenuBar, QStatusBar,
-    QGridLayout, QFrame
+    QGridLayout, QFrame, QSpinBox, QProgressBar
 )
-from PySide6.QtCore import Qt, QSettings
-from PySide6.QtGui import QAction, QFont, QIcon, QPalette, QColor
+from PySide6.QtCore import Qt, QSettings, QObject, QRunnable, QThreadPool, QTimer, QUrl, Signal
+from PySide6.QtGui import QAction, QFont, QIcon, QPalette, QColor, QDesktopServices
 
-# --- AST Parsing Logic (Significantly Enhanced) ---
-class CodeStructureExtractor(ast.NodeVisitor):
-    def __init__(self):
-        self.structure = {
-            "module_name": None,
-            "global_variables": [],
-            "classes": [],
-            "functions": [],
-            "imports": {
-                "direct": [],
-                "from": []
-            },
-            "calls": collections.defaultdict(set) # Source -> Destination calls
-        }
-        self.current_scope = [] # Stack to track current function/class scope
-
-    def _add_call(self, caller_id, callee_id):
-        self.structure["calls"][caller_id].add(callee_id)
-
-    def _get_current_scope_id(self):
-        if self.current_scope:
-            return ".".join(self.current_scope)
-        return self.structure["module_name"] # Module level calls
-
-    def _get_full_name(self, node):
-        if isinstance(node, ast.Name):
-            return node.id
-        elif isinstance(node, ast.Attribute):
-            return f"{self._get_full_name(node.value)}.{node.attr}"
-        elif isinstance(node, ast.Call):
-            return f"{self._get_full_name(node.func)}(...)"
-        return "<?>"
-
-    def visit_Module(self, node):
-        self.structure["module_name"] = "Module" # Default if not set later from filename
-        self.generic_visit(node)
-
-    def visit_ClassDef(self, node):
-        class_info = {
-            "name": node.name,
-            "methods": [],
-            "bases": [self._get_full_name(base) for base in node.bases if isinstance(base, (ast.Name, ast.Attribute))],
-            "docstring": ast.get_docstring(node),
-            "attributes": [],
-            "decorators": [self._get_full_name(d) for d in node.decorator_list if self._get_full_name(d) is not None]
-        }
-        self.structure["classes"].append(class_info)
-
-        self.current_scope.append(node.name)
-        self.generic_visit(node)
-        self.current_scope.pop()
-
-    def visit_FunctionDef(self, node):
-        args_list = []
-        for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs:
-            arg_name = arg.arg
-            arg_annotation = ""
-            if arg.annotation:
-                arg_annotation = f": {self._get_full_name(arg.annotation)}"
-            args_list.append(f"{arg_name}{arg_annotation}")
-
-        # Add default values
-        for i, default in enumerate(node.args.defaults[::-1]):
-            args_list[len(args_list) - 1 - i] += f"={self._get_full_name(default)}"
-        
-        # Add keyword-only argument defaults
-        if node.args.kwonlyargs:
-            for i, default in enumerate(node.args.kw_defaults[::-1]):
-                if default:
-                    args_list[len(args_list) - len(node.args.kwonlyargs) - 1 - i] += f"={self._get_full_name(default)}"
-
-        return_annotation = ""
-        if node.returns:
-            return_annotation = f" -> {self._get_full_name(node.returns)}"
-
-        func_info = {
-            "name": node.name,
-            "args": args_list,
-            "docstring": ast.get_docstring(node),
-            "return_annotation": return_annotation,
-            "decorators": [self._get_full_name(d) for d in node.decorator_list if self._get_full_name(d) is not None],
-            "calls_made": set() # Calls originating from this function/method
-        }
-
-        if self.current_scope and self.current_scope[-1] in [cls["name"] for cls in self.structure["classes"]]:
-            # This is a method
-            class_name = self.current_scope[-1]
-            for cls in self.structure["classes"]:
-                if cls["name"] == class_name:
-                    cls["methods"].append(func_info)
-                    break
-        else:
-            # This is a global function
-            self.structure["functions"].append(func_info)
-        
-        self.current_scope.append(node.name)
-        self.generic_visit(node)
-        self.current_scope.pop()
-
-    def visit_Assign(self, node):
-        for target in node.targets:
-            if isinstance(target, ast.Name):
-                var_info = {
-                    "name": target.id,
-                    "value": self._get_full_name(node.value)
-                }
-                if self.current_scope: # Assume it's an attribute if in a class scope
-                    scope_name = self.current_scope[-1]
-                    for cls in self.structure["classes"]:
-                        if cls["name"] == scope_name:
-                            cls["attributes"].append(var_info)
-                            break
-                else: # Global variable
-                    self.structure["global_variables"].append(var_info)
-        self.generic_visit(node)
-
-    def visit_AnnAssign(self, node):
-        if isinstance(node.target, ast.Name):
-            var_info = {
-                "name": node.target.id,
-                "annotation": self._get_full_name(node.annotation),
-                "value": self._get_full_name(node.value) if node.value else None
-            }
-            if self.current_scope:
-                scope_name = self.current_scope[-1]
-                for cls in self.structure["classes"]:
-                    if cls["name"] == scope_name:
-                        cls["attributes"].append(var_info)
-                        break
-            else:
-                self.structure["global_variables"].append(var_info)
-        self.generic_visit(node)
-
-    def visit_Import(self, node):
-        for alias in node.names:
-            self.structure["imports"]["direct"].append(alias.name)
-        self.generic_visit(node)
-
-    def visit_ImportFrom(self, node):
-        module = node.module if node.module else ""
-        for alias in node.names:
-            self.structure["imports"]["from"].append(f"{module}.{alias.name}" if module else alias.name)
-        self.generic_visit(node)
-
-    def visit_Call(self, node):
-        caller_id = self._get_current_scope_id()
-        callee_id = self._get_full_name(node.func)
-        self._add_call(caller_id, callee_id)
-        self.generic_visit(node)
-    
-    # Basic control flow for graph labeling (can be expanded)
-    def visit_If(self, node):
-        caller_id = self._get_current_scope_id()
-        self._add_call(caller_id, f"Condition: {self._get_full_name(node.test)}")
-        self.generic_visit(node)
-    
-    def visit_For(self, node):
-        caller_id = self._get_current_scope_id()
-        self._add_call(caller_id, f"For Loop: {self._get_full_name(node.iter)}")
-        self.generic_visit(node)
-
-    def visit_While(self, node):
-        caller_id = self._get_current_scope_id()
-        self._add_call(caller_id, f"While Loop: {self._get_full_name(node.test)}")
-        self.generic_visit(node)
-
-def parse_python_file(filepath):
-    if not os.path.exists(filepath):
-        return None, f"Error: File does not exist '{filepath}'"
-
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            source_code = f.read()
-    except Exception as e:
-        return None, f"Error: Could not read file '{filepath}': {e}"
-
-    try:
-        tree = ast.parse(source_code)
-        extractor = CodeStructureExtractor()
-        extractor.structure["module_name"] = os.path.basename(filepath).replace(".py", "")
-        extractor.visit(tree)
-        return extractor.structure, None
-    except SyntaxError as e:
-        return None, f"Parsing error: File '{filepath}' contains syntax error: {e}"
-    except Exception as e:
-        return None, f"An unknown error occurred during parsing: {e}"
-
-def format_structure_text(structure):
-    if not structure:
-        return "No code structure to display."
-
-    output = []
-    output.append(f"--- Module: {structure['module_name']} ---")
-
-    if structure["imports"]["direct"] or structure["imports"]["from"]:
-        output.append("\n--- Imports ---")
-        for imp in sorted(list(set(structure["imports"]["direct"]))):
-            output.append(f"  - import {imp}")
-        for imp_from in sorted(list(set(structure["imports"]["from"]))):
-            parts = imp_from.split('.', 1)
-            if len(parts) > 1:
-                output.append(f"  - from {parts[0]} import {parts[1]}")
-            else:
-                output.append(f"  - from . import {parts[0]}")
-
-    if structure["global_variables"]:
-        output.append("\n--- Global Variables ---")
-        for var in structure["global_variables"]:
-            var_line = f"  - {var['name']}"
-            if 'annotation' in var and var['annotation']:
-                var_line += f": {var['annotation']}"
-            if var['value'] is not None:
-                var_line += f" = {var['value']}"
-            output.append(var_line)
-
-    if structure["functions"]:
-        output.append("\n--- Global Functions ---")
-        for func in structure["functions"]:
-            decorators_str = "".join([f"  @{d}\n" for d in func['decorators']]) if func['decorators'] else ""
-            output.append(f"{decorators_str}  def {func['name']}({', '.join(func['args'])}){func['return_annotation']}")
-            if func['docstring']:
-                output.append(f"    Doc: \"\"\"{func['docstring'].strip().splitlines()[0]}\"\"\"")
-            
-            func_id = f"{structure['module_name']}.{func['name']}"
-            if func_id in structure["calls"] and structure["calls"][func_id]:
-                output.append("    Calls:")
-                for callee in sorted(list(structure["calls"][func_id])):
-                    output.append(f"      - {callee}")
-
-
-    if structure["classes"]:
-        output.append("\n--- Classes ---")
-        for cls in structure["classes"]:
-            bases_str = f"({', '.join(cls['bases'])})" if cls['bases'] else ""
-            decorators_str = "".join([f"  @{d}\n" for d in cls['decorators']]) if cls['decorators'] else ""
-            output.append(f"{decorators_str}  class {cls['name']}{bases_str}:")
-            if cls['docstring']:
-                output.append(f"    Doc: \"\"\"{cls['docstring'].strip().splitlines()[0]}\"\"\"")
-
-            if cls["attributes"]:
-                output.append("    --- Class Attributes ---")
-                for attr in cls["attributes"]:
-                    attr_line = f"    - {attr['name']}"
-                    if 'annotation' in attr and attr['annotation']:
-                        attr_line += f": {attr['annotation']}"
-                    if attr['value'] is not None:
-                        attr_line += f" = {attr['value']}"
-                    output.append(attr_line)
-
-            if cls["methods"]:
-                output.append("    --- Methods ---")
-                for method in cls["methods"]:
-                    decorators_str = "".join([f"      @{d}\n" for d in method['decorators']]) if method['decorators'] else ""
-                    output.append(f"{decorators_str}      def {method['name']}({', '.join(method['args'])}){method['return_annotation']}")
-                    if method['docstring']:
-                        output.append(f"        Doc: \"\"\"{method['docstring'].strip().splitlines()[0]}\"\"\"")
-                    
-                    method_id = f"{structure['module_name']}.{cls['name']}.{method['name']}"
-                    if method_id in structure["calls"] and structure["calls"][method_id]:
-                        output.append("        Calls:")
-                        for callee in sorted(list(structure["calls"][method_id])):
-                            output.append(f"          - {callee}")
-    
-    # Module-level calls (e.g., direct calls outside functions/classes)
-    module_calls_key = structure["module_name"]
-    if module_calls_key in structure["calls"] and structure["calls"][module_calls_key]:
-        output.append("\n--- Module-Level Calls ---")
-        for callee in sorted(list(structure["calls"][module_calls_key])):
-            output.append(f"  - {callee}")
-
-    return "\n".join(output)
-
-def generate_graph_visualization(structure, output_filepath, format="png"):
-    if not structure:
-        return None, "No graph can be generated."
-
-    dot = graphviz.Digraph(
-        comment=f'Code Structure of {structure["module_name"]}',
-        graph_attr={
-            'rankdir': 'LR', # Left to Right
-            'overlap': 'false',
-            'splines': 'true',
-            'bgcolor': 'transparent'
-        },
-        node_attr={
-            'fontsize': '10',
-            'fontname': 'Helvetica',
-            'shape': 'box',
-            'style': 'filled'
-        },
-        edge_attr={'fontsize': '8', 'fontname': 'Helvetica'}
-    )
-
-    # Use a set to keep track of added nodes to avoid duplicates and simplify call connections
-    all_nodes = set()
-    
-    # Module Cluster
-    with dot.subgraph(name=f'cluster_module_{structure["module_name"]}') as c:
-        c.attr(label=f'Module: {structure["module_name"]}', color='blue', style='rounded,filled', fillcolor='#E0FFFF')
-        module_id = f"module_{structure['module_name']}"
-        c.node(module_id, f'Module: {structure["module_name"]}', shape='folder', style='filled', fillcolor='#ADD8E6')
-        all_nodes.add(module_id)
-
-        # Global Variables
-        if structure["global_variables"]:
-            gv_node_id = f"{module_id}_globals"
-            c.node(gv_node_id, "Global Variables", shape='note', style='filled', fillcolor='grey', fontcolor='white')
-            c.edge(module_id, gv_node_id, label='defines')
-            all_nodes.add(gv_node_id)
-
-
-        # Global Functions
-        for func in structure["functions"]:
-            func_label = f"Function: {func['name']}(\n{', '.join(func['args'])}){func['return_annotation']}"
-            if func['decorators']:
-                func_label = f"Decorators: {', '.join(func['decorators'])}\n" + func_label
-            func_id = f"{module_id}.{func['name']}"
-            c.node(func_id, func_label, shape='ellipse', style='filled', fillcolor='#90EE90') # Light Green
-            c.edge(module_id, func_id, label='contains')
-            all_nodes.add(func_id)
-
-    # Classes Subgraphs
-    for cls in structure["classes"]:
-        class_id = f"{module_id}.{cls['name']}"
-        with dot.subgraph(name=f'cluster_class_{cls["name"]}') as c_cls:
-            bases_str = f"({', '.join(cls['bases'])})" if cls['bases'] else ""
-            decorators_str = f"Decorators: {', '.join(cls['decorators'])}\n" if cls['decorators'] else ""
-            c_cls.attr(label=f'{decorators_str}Class: {cls["name"]}{bases_str}', color='darkgreen', style='rounded,filled', fillcolor='#FFFACD') # Lemon Chiffon
-            
-            c_cls.node(class_id, f'Class: {cls["name"]}{bases_str}', shape='component', style='filled', fillcolor='#FFD700') # Gold
-            all_nodes.add(class_id)
-            dot.edge(module_id, class_id, label='contains') # Link class to module
-
-            # Class Attributes
-            for attr in cls["attributes"]:
-                attr_label = f"Attribute: {attr['name']}"
-                if 'annotation' in attr and attr['annotation']:
-                    attr_label += f": {attr['annotation']}"
-                if attr['value'] is not None:
-                    attr_label += f" = {attr['value']}"
-                attr_id = f"{class_id}.{attr['name']}"
-                c_cls.node(attr_id, attr_label, shape='rectangle', style='filled', fillcolor='#D3D3D3') # Light Gray
-                c_cls.edge(class_id, attr_id, label='has attribute')
-                all_nodes.add(attr_id)
-
-            # Methods
-            for method in cls["methods"]:
-                method_id = f"{class_id}.{method['name']}"
-                method_label = f"Method: {method['name']}(\n{', '.join(method['args'])}){method['return_annotation']}"
-                if method['decorators']:
-                    method_label = f"Decorators: {', '.join(method['decorators'])}\n" + method_label
-                c_cls.node(method_id, method_label, shape='octagon', style='filled', fillcolor='#FFB6C1') # Light Pink
-                c_cls.edge(class_id, method_id, label='contains method')
-                all_nodes.add(method_id)
-
-    # --- Add all recognized nodes to the graph even if they are just targets of a call ---
-    # This helps when drawing edges to external/imported entities
-    # Note: this might create "floating" nodes for unparsed external calls
-    for caller, callees in structure["calls"].items():
-        for callee in callees:
-            if callee not in all_nodes:
-                # Add a generic node for external calls or unparsed elements
-                dot.node(callee, callee, shape='box', style='dashed', color='gray', fillcolor='white')
-                all_nodes.add(callee)
-    
-    # --- Add Call Edges ---
-    # Important: Ensure both source and target nodes exist before adding an edge
-    for caller_raw, callees_raw in structure["calls"].items():
-        # Determine the full ID of the caller within the graph context
-        caller_parts = caller_raw.split('.')
-        caller_id = ""
-        if len(caller_parts) == 1: # Module-level function or global call
-            caller_id = f"module_{structure['module_name']}.{caller_parts[0]}" if caller_parts[0] != structure['module_name'] else f"module_{structure['module_name']}"
-        elif len(caller_parts) == 2: # Class method
-            caller_id = f"module_{structure['module_name']}.{caller_parts[0]}.{caller_parts[1]}"
-        elif len(caller_parts) == 3: # Nested method (unlikely with current AST visitor but for robustness)
-             caller_id = f"module_{structure['module_name']}.{caller_parts[0]}.{caller_parts[1]}.{caller_parts[2]}"
-
-
-        if caller_id not in all_nodes:
-            # If the caller itself wasn't directly found (e.g., module-level calls from the base module ID)
-            if caller_raw == structure["module_name"] and f"module_{structure['module_name']}" in all_nodes:
-                caller_id = f"module_{structure['module_name']}"
-            else:
-                dot.node(caller_id, caller_raw, shape='box', style='dashed', color='red', fillcolor='white') # Indicate missing source for debugging
-                all_nodes.add(caller_id)
-        
-        for callee in callees_raw:
-            # Determine the full ID of the callee (could be internal or external)
-            callee_id = callee # Default to raw name for external/unresolved calls
-            
-            # Check if callee is a known internal function/method/class
-            # This is a heuristic and might need more robust lookup for complex structures
-            if f"module_{structure['module_name']}.{callee}" in all_nodes:
-                callee_id = f"module_{structure['module_name']}.{callee}"
+# The Qt-free parsing and graph code lives in code_structure.py
+from code_structure import (
+    MAX_GRAPH_NODES, parse_python_file, format_structure_text, generate_graph_visualization
+)
+
+# --- Background Tasks ---
+# Parsing and rendering run on QThreadPool workers so the event loop keeps
+# painting during multi-second dot runs; results come back as queued signals.
+# Every run() ends in exactly one finished or failed emit, even if it raises, so
+# the window never stays busy waiting on a worker that died.
+PARSING_ERROR_TITLE = "Parsing Error"
+
+class WorkerSignals(QObject):
+    finished = Signal(str, str) # (result, message)
+    failed = Signal(str, str) # (dialog title, error message)
+
+class TextStructureWorker(QRunnable):
+    def __init__(self, filepath):
+        super().__init__()
+        self.filepath = filepath
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            structure_data, error_message = parse_python_file(self.filepath)
+            if structure_data:
+                self.signals.finished.emit(format_structure_text(structure_data), "")
             else:
-                # Try to find if it's a method of an existing class
-                for cls in structure["classes"]:
-                    if f"module_{structure['module_name']}.{cls['name']}.{callee}" in all_nodes:
-                        callee_id = f"module_{structure['module_name']}.{cls['name']}.{callee}"
-                        break
-            
-            if caller_id and callee_id and caller_id != callee_id: # Avoid self-loops for now
-                dot.edge(caller_id, callee_id, label='calls', color='purple')
-
-    # Add inheritance edges explicitly (already done within class subgraph, but reinforcing direct link for clarity)
-    for cls in structure["classes"]:
-        class_id = f"module_{structure['module_name']}.{cls['name']}"
-        for base in cls['bases']:
-            base_id = f"module_{structure['module_name']}.{base}" # Assume base is in current module for now
-            if base_id not in all_nodes: # If base class not defined in current module, add it as a generic node
-                dot.node(base_id, base, shape='box', style='dashed', color='grey', fillcolor='white')
-                all_nodes.add(base_id)
-            dot.edge(base_id, class_id, style='dashed', arrowhead='empty', label='inherits')
-
-
-    try:
-        full_output_path = dot.render(os.path.splitext(output_filepath)[0], format=format, view=False, cleanup=True)
-        return full_output_path, f"Visualization graph saved to: {full_output_path}"
-    except graphviz.backend.ExecutableNotFound:
-        return None, "Error: Graphviz executable (dot) not found. Please ensure Graphviz is installed and added to your system's PATH."
-    except Exception as e:
-        return None, f"Error generating graph: {e}"
+                self.signals.failed.emit(PARSING_ERROR_TITLE, error_message)
+        except Exception as e:
+            self.signals.failed.emit("Error", f"Could not build the text structure: {e}")
+
+class GraphWorker(QRunnable):
+    def __init__(self, filepath, output_filepath, format, max_nodes):
+        super().__init__()
+        self.filepath = filepath
+        self.output_filepath = output_filepath
+        self.format = format
+        self.max_nodes = max_nodes
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            structure_data, parse_error = parse_python_file(self.filepath)
+            if not structure_data:
+                self.signals.failed.emit(PARSING_ERROR_TITLE, parse_error)
+                return
+
+            full_path, graph_message = generate_graph_visualization(structure_data, self.output_filepath, self.format, self.max_nodes)
+        except Exception as e:
+            self.signals.failed.emit("Graph Generation Error", f"Error generating graph: {e}")
+            return
+        if full_path:
+            self.signals.finished.emit(full_path, graph_message)
+        else:
+            self.signals.failed.emit("Graph Generation Error", graph_message)
+
+# Fallback for when Qt finds no handler (e.g. no desktop integration available)
+SYSTEM_OPENER = "open" if sys.platform == "darwin" else "xdg-open"
+
+def open_with_system_viewer(path):
+    if sys.platform == "win32":
+        os.startfile(path)
+        return
+    # posix_spawnp starts the opener without subprocess's fork, pipe and wait set-up;
+    # a daemon thread reaps it so it does not linger as a zombie
+    pid = os.posix_spawnp(SYSTEM_OPENER, [SYSTEM_OPENER, path], os.environ)
+    threading.Thread(target=os.waitpid, args=(pid, 0), daemon=True).start()
 
 # --- GUI Application (Mostly Unchanged, but with minor updates for new features) ---
 class CodeVisualizerApp(QWidget):
@@ -448,7 +91,15 @@ class CodeVisualizerApp(QWidget):
 
         self.current_filepath = ""
         self.last_generated_graph_path = ""
+        self._last_graph_checked = float("-inf") # time.monotonic() when the graph last existed
+        self._active_worker = None # Keeps the running worker (and its signals) alive
         self.settings = QSettings("MyCompany", "CodeVisualizer")
+        # Status messages are coalesced: only the latest one within 50 ms is shown
+        self._pending_status = None
+        self._status_timer = QTimer(self)
+        self._status_timer.setSingleShot(True)
+        self._status_timer.setInterval(50)
+        self._status_timer.timeout.connect(self._flush_status)
 
         self.init_ui()
         self.load_settings()
@@ -515,6 +166,14 @@ class CodeVisualizerApp(QWidget):
         self.open_graph_btn.setEnabled(False)
         top_layout.addWidget(self.open_graph_btn, 2, 2)
 
+        top_layout.addWidget(QLabel("Max Graph Nodes:"), 3, 0)
+        self.max_nodes_spin = QSpinBox(self)
+        self.max_nodes_spin.setRange(0, 100000)
+        self.max_nodes_spin.setValue(MAX_GRAPH_NODES)
+        self.max_nodes_spin.setSpecialValueText("No limit")
+        self.max_nodes_spin.setToolTip("Larger modules are split into an overview graph plus one graph per class.")
+        top_layout.addWidget(self.max_nodes_spin, 3, 1)
+
         main_layout.addWidget(top_frame)
 
         # Text Output Area
@@ -526,20 +185,38 @@ class CodeVisualizerApp(QWidget):
         # Status Bar
         self.status_bar = QStatusBar(self)
         main_layout.addWidget(self.status_bar)
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 0) # Busy indicator
+        self.progress_bar.setMaximumWidth(150)
+        self.progress_bar.hide()
+        self.status_bar.addPermanentWidget(self.progress_bar)
         self.update_status("Ready to visualize your Python code.")
 
     def load_settings(self):
+        # Older versions kept the theme in a top-level "theme" key; move it into the ui group
+        if self.settings.contains("theme"):
+            self.settings.setValue("ui/theme", self.settings.value("theme"))
+            self.settings.remove("theme")
+        self.settings.beginGroup("ui")
         theme = self.settings.value("theme", "light")
+        self.settings.endGroup()
         if theme == "dark":
             self.set_dark_theme()
         else:
             self.set_light_theme()
 
     def save_settings(self):
+        # Only updates QSettings' in-memory copy; it is written out in closeEvent
+        self.settings.beginGroup("ui")
         if self.palette().color(QPalette.ColorRole.Window).name() == "#353535":
             self.settings.setValue("theme", "dark")
         else:
             self.settings.setValue("theme", "light")
+        self.settings.endGroup()
+
+    def closeEvent(self, event):
+        self.settings.sync()
+        super().closeEvent(event)
 
     def toggle_theme(self):
         if self.palette().color(QPalette.ColorRole.Window).name() == "#353535":
@@ -549,7 +226,7 @@ class CodeVisualizerApp(QWidget):
         self.save_settings()
 
     def set_light_theme(self):
-        app.setPalette(QPalette())
+        QApplication.instance().setPalette(QPalette())
         self.update_status("Theme set to Light.", "green")
 
     def set_dark_theme(self):
@@ -567,10 +244,16 @@ class CodeVisualizerApp(QWidget):
         palette.setColor(QPalette.ColorRole.Link, QColor(42, 130, 218))
         palette.setColor(QPalette.ColorRole.Highlight, QColor(42, 130, 218))
         palette.setColor(QPalette.ColorRole.HighlightedText, QColor(0, 0, 0))
-        app.setPalette(palette)
+        QApplication.instance().setPalette(palette)
         self.update_status("Theme set to Dark.", "green")
 
     def update_status(self, message, color="black"):
+        self._pending_status = (message, color)
+        if not self._status_timer.isActive():
+            self._status_timer.start()
+
+    def _flush_status(self):
+        message, _color = self._pending_status
         self.status_bar.showMessage(message)
 
     def log_output(self, message):
@@ -599,25 +282,30 @@ class CodeVisualizerApp(QWidget):
 
     def show_text_structure(self):
         if not self.current_filepath or not os.path.exists(self.current_filepath):
-            QMessageBox.warning(self, "Warning", "Please select a valid Python file first!")
+            self.show_message(QMessageBox.Icon.Warning, "Warning", "Please select a valid Python file first!")
             self.update_status("Error: No file selected.", "red")
             return
 
         self.update_status(f"Parsing '{os.path.basename(self.current_filepath)}'...", "blue")
-        structure_data, error_message = parse_python_file(self.current_filepath)
-
-        if structure_data:
-            text_output = format_structure_text(structure_data)
-            self.log_output(text_output)
-            self.update_status("Text structure displayed successfully.", "green")
-        else:
-            self.log_output(f"Parsing failed: {error_message}")
-            QMessageBox.critical(self, "Parsing Error", error_message)
-            self.update_status("Parsing failed.", "red")
+        worker = TextStructureWorker(self.current_filepath)
+        worker.signals.finished.connect(self.on_text_structure_ready)
+        worker.signals.failed.connect(self.on_text_structure_failed)
+        self.start_worker(worker)
+
+    def on_text_structure_ready(self, text_output, _message):
+        self.finish_worker()
+        self.log_output(text_output)
+        self.update_status("Text structure displayed successfully.", "green")
+
+    def on_text_structure_failed(self, title, error_message):
+        self.finish_worker()
+        self.log_output(f"Parsing failed: {error_message}")
+        self.show_message(QMessageBox.Icon.Critical, title, error_message)
+        self.update_status("Parsing failed.", "red")
 
     def generate_graph_visualization(self):
         if not self.current_filepath or not os.path.exists(self.current_filepath):
-            QMessageBox.warning(self, "Warning", "Please select a valid Python file first!")
+            self.show_message(QMessageBox.Icon.Warning, "Warning", "Please select a valid Python file first!")
             self.update_status("Error: No file selected.", "red")
             return
 
@@ -636,48 +324,84 @@ class CodeVisualizerApp(QWidget):
             return
 
         self.update_status(f"Generating graph for '{os.path.basename(self.current_filepath)}' in {selected_format.upper()} format...", "blue")
-        structure_data, parse_error = parse_python_file(self.current_filepath)
-
-        if structure_data:
-            full_path, graph_message = generate_graph_visualization(structure_data, save_filepath, selected_format)
-
-            if full_path:
-                self.last_generated_graph_path = full_path
-                self.open_graph_btn.setEnabled(True)
-                self.log_output(graph_message)
-                QMessageBox.information(self, "Success", graph_message)
-                self.update_status(f"Graph generated successfully: {os.path.basename(full_path)}", "green")
-            else:
-                self.log_output(graph_message)
-                QMessageBox.critical(self, "Graph Generation Error", graph_message)
-                self.update_status("Graph generation failed.", "red")
-                self.open_graph_btn.setEnabled(False)
-        else:
-            self.log_output(f"Parsing failed, cannot generate graph: {parse_error}")
-            QMessageBox.critical(self, "Parsing Error", parse_error)
+        self.open_graph_btn.setEnabled(False)
+        worker = GraphWorker(self.current_filepath, save_filepath, selected_format, self.max_nodes_spin.value())
+        worker.signals.finished.connect(self.on_graph_ready)
+        worker.signals.failed.connect(self.on_graph_failed)
+        self.start_worker(worker)
+
+    def on_graph_ready(self, full_path, graph_message):
+        self.finish_worker()
+        self.last_generated_graph_path = full_path
+        self._last_graph_checked = time.monotonic() # Just written
+        self.open_graph_btn.setEnabled(True)
+        self.log_output(graph_message)
+        self.show_message(QMessageBox.Icon.Information, "Success", graph_message)
+        self.update_status(f"Graph generated successfully: {os.path.basename(full_path)}", "green")
+
+    def on_graph_failed(self, title, error_message):
+        self.finish_worker()
+        if title == PARSING_ERROR_TITLE:
+            self.log_output(f"Parsing failed, cannot generate graph: {error_message}")
             self.update_status("Parsing failed.", "red")
-            self.open_graph_btn.setEnabled(False)
+        else:
+            self.log_output(error_message)
+            self.update_status("Graph generation failed.", "red")
+        self.show_message(QMessageBox.Icon.Critical, title, error_message)
+
+    def show_message(self, icon, title, text):
+        # Window-modal and opened with open(), not exec(): it returns at once, so the
+        # calling slot finishes its status and button updates and the event loop
+        # keeps running while the dialog is up. None of these need an answer.
+        message_box = QMessageBox(icon, title, text, QMessageBox.StandardButton.Ok, self)
+        message_box.setWindowModality(Qt.WindowModality.WindowModal)
+        message_box.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        message_box.open()
+
+    def start_worker(self, worker):
+        # One task at a time: the actions that start or change a task are disabled until it reports back
+        self._active_worker = worker
+        self.set_busy(True)
+        QThreadPool.globalInstance().start(worker)
+
+    def finish_worker(self):
+        self._active_worker = None
+        self.set_busy(False)
+
+    def set_busy(self, busy):
+        for widget in (self.select_file_btn, self.show_text_btn, self.generate_graph_btn, self.select_file_action):
+            widget.setEnabled(not busy)
+        self.progress_bar.setVisible(busy)
+
+    def last_graph_exists(self):
+        # Clicks within a second of the last successful check reuse it instead of stat-ing again
+        if not self.last_generated_graph_path:
+            return False
+        now = time.monotonic()
+        if now - self._last_graph_checked >= 1.0:
+            if not os.path.exists(self.last_generated_graph_path):
+                return False
+            self._last_graph_checked = now
+        return True
 
     def open_last_generated_graph(self):
-        if not self.last_generated_graph_path or not os.path.exists(self.last_generated_graph_path):
-            QMessageBox.warning(self, "Warning", "No graph has been generated or file not found.")
+        if not self.last_graph_exists():
+            self.show_message(QMessageBox.Icon.Warning, "Warning", "No graph has been generated or file not found.")
             self.update_status("Error: No generated graph to open.", "red")
             return
 
+        # Qt hands the file to the desktop's default viewer for its type on every platform
         try:
-            if sys.platform == "win32":
-                os.startfile(self.last_generated_graph_path)
-            elif sys.platform == "darwin": # macOS
-                subprocess.run(['open', self.last_generated_graph_path])
-            else: # Linux and other Unix-like systems
-                subprocess.run(['xdg-open', self.last_generated_graph_path])
-            self.update_status(f"Opening {os.path.basename(self.last_generated_graph_path)}...", "green")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not open file: {e}")
+            if not QDesktopServices.openUrl(QUrl.fromLocalFile(self.last_generated_graph_path)):
+                open_with_system_viewer(self.last_generated_graph_path)
+        except OSError as e:
+            self.show_message(QMessageBox.Icon.Critical, "Error", f"Could not open file: {e}")
             self.update_status(f"Error opening graph: {e}", "red")
+        else:
+            self.update_status(f"Opening {os.path.basename(self.last_generated_graph_path)}...", "green")
 
     def show_about_dialog(self):
-        QMessageBox.about(self, "About Python Code Structure Visualizer",
+        self.show_message(QMessageBox.Icon.Information, "About Python Code Structure Visualizer",
                           "<h2>Python Code Structure Visualizer</h2>"
                           "<p>Version 1.2 (Advanced Analysis)</p>"
                           "<p>Developed by Angelus</p>"
@@ -688,8 +412,11 @@ class CodeVisualizerApp(QWidget):
                           "<p>Requires Graphviz installed on your system.</p>"
                           "<p><i>Note: Theme setting is stored in system preferences.</i></p>")
 
-if __name__ == "__main__":
+def main():
     app = QApplication(sys.argv)
     window = CodeVisualizerApp()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    return app.exec()
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -6,127 +6,382 @@ and the Ship class from ship.py. This module initialises the space exploration
 map and ship, and runs the game where players issue commands to explore the
 map, interact with entities, and aim to reach the destination.
 '''
+import contextlib
+import io
+import os
+import queue
+import sys
+import threading
 from space_map import create_map, display_map, populate_map
 from ship import Ship
 # import your 2 files here!
-def main():
+
+class Glyph:
     '''
-    Runs the entire program from start to end.
+    Map cells as stored in GameController.game_map, one byte each.
 
-    All program logic must be executed within the main() function. We have
-    provided some starting implementation and comments to help you out.
+    Kept in a class so they can be used as value patterns in match
+    statements (a bare name there would capture instead of compare).
     '''
-    print('>>> STARTING ROUTE: Kepler-452b -> Sector 9-Delta\n')
-    # 1. Configuring navigation systems
-    # - Ask for size of map
-    # - Then use this size to create a map reusing functions from the space_map
-    #   module!
-    # ...
-    print(">> CONFIGURING NAVIGATIONAL SYSTEMS")
-    while True:
-        try:
-            size = int(input("Enter size of map (n >= 2): "))
-            if size>=2:
-                break
-            else:
-                print("Error: n too low")
-        except ValueError:
+    EMPTY = ord(" ")
+    SHIP = ord("@")
+    DESTINATION = ord("X")
+    WRECK = ord("L")
+    WIN = ord("W")
+
+# (dx, dy) for each movement command; y grows southwards
+_DELTAS = {"n": (0, -1), "e": (1, 0), "s": (0, 1), "w": (-1, 0)}
+# Everything accepted at the gameplay prompt, for tab completion
+_COMMANDS = ("n", "e", "s", "w", "map", "status", "q")
+
+def _parse_int(text):
+    '''
+    Returns text as an int, or None if it is not a whole number.
+
+    Input is checked with str.isdecimal() first, so rejecting a bad entry
+    does not cost a ValueError. Accepts what int() accepts, including
+    single underscores between digits (1_000).
+    '''
+    text = text.strip()
+    digits = text[1:] if text.startswith(("+", "-")) else text
+    if "_" in digits:
+        if digits.startswith("_") or digits.endswith("_") or "__" in digits:
+            return None
+        digits = digits.replace("_", "")
+    if not digits.isdecimal():
+        return None
+    return int(text)
+
+class GameController:
+    '''
+    Runs the game one line of input at a time.
+
+    The game is a state machine: on_command() handles a single line for the
+    current stage (map size, ship name, fuel, then gameplay commands) and
+    prompt() gives the text to ask for the next one. Nothing here blocks on
+    input, so the same controller can be driven by the terminal loop in
+    main() or by a Qt line edit in run_window().
+
+    The map from space_map is copied into game_map, one flat bytearray with
+    cell (x, y) at index y * size + x, so a move is a single index into a
+    contiguous buffer. Rows are only rebuilt for display_map().
+    '''
+    PROMPTS = {
+        "size": "Enter size of map (n >= 2): ",
+        "name": "Enter ship name: ",
+        "fuel": "Enter fuel (1-99): ",
+        "play": "Enter (n,e,s,w | map | status): ",
+    }
+
+    def __init__(self):
+        self.state = "size"
+        self.size = None
+        self.game_map = None
+        self.ship_name = None
+        self.odyssey = None
+        self.finished = False
+
+    def start(self):
+        '''
+        Prints the opening messages, before the first prompt.
+        '''
+        print('>>> STARTING ROUTE: Kepler-452b -> Sector 9-Delta\n')
+        # 1. Configuring navigation systems
+        # - Ask for size of map
+        # - Then use this size to create a map reusing functions from the space_map
+        #   module!
+        print(">> CONFIGURING NAVIGATIONAL SYSTEMS")
+
+    def prompt(self):
+        '''
+        Returns the prompt for the input the game is waiting on.
+        '''
+        return self.PROMPTS[self.state]
+
+    def on_command(self, text):
+        '''
+        Handles one line of input for the current stage of the game.
+        '''
+        if self.state == "size":
+            self._configure_map(text)
+        elif self.state == "name":
+            self._configure_name(text)
+        elif self.state == "fuel":
+            self._configure_fuel(text)
+        elif self.state == "play":
+            self._play(text)
+
+    def _configure_map(self, text):
+        size = _parse_int(text)
+        if size is None:
             print("Error: Invalid input. Please enter an integer.")
-    game_map = create_map(size)
-    populate_map(game_map)
-    print(f"{size} x {size} map initialised.\n")
-    display_map(game_map)
-    print()
-    print(">> NAVIGATIONAL SYSTEMS READY\n")
-    # 2. Configuring ship systems
-    # - Ask for name and fuel of ship
-    # - Then using the name and fuel, create a Ship instance reusing the Ship
-    #   class from the ship module!
-    # ...
-    print(">> CONFIGURING SHIP SYSTEMS")
-    ship_name = input("Enter ship name: ")
-    while True:
-        try:
-            fuel=int(input("Enter fuel (1-99): "))
-            if 1<=fuel<=99:
-                break
-            elif fuel < 1:
-                print("Error: fuel too low")
-            else:
-                print("Error: fuel too high")
-        except ValueError:
+            return
+        if size < 2:
+            print("Error: n too low")
+            return
+        self.size = size
+        rows = create_map(size)
+        populate_map(rows)
+        self.game_map = bytearray(ord(cell) for row in rows for cell in row)
+        print(f"{size} x {size} map initialised.\n")
+        self._display_map()
+        print()
+        print(">> NAVIGATIONAL SYSTEMS READY\n")
+        # 2. Configuring ship systems
+        # - Ask for name and fuel of ship
+        # - Then using the name and fuel, create a Ship instance reusing the Ship
+        #   class from the ship module!
+        print(">> CONFIGURING SHIP SYSTEMS")
+        self.state = "name"
+
+    def _configure_name(self, text):
+        self.ship_name = text
+        self.state = "fuel"
+
+    def _configure_fuel(self, text):
+        fuel = _parse_int(text)
+        if fuel is None:
             print("Error: Invalid input. Please enter an integer.")
-    odyssey=Ship(ship_name,fuel)
-    odyssey.x,odyssey.y=0,0
-    odyssey.put_x,odyssey.put_y=0,0
-    print(odyssey)
-    print(">> SHIP SYSTEMS READY\n")
-    print(">>> EXECUTING LIFTOFF: EXITING Kepler-452b's ORBIT\n")
-    print('>>> AWAITING COMMANDS\n')
-    # 3. Game Loop
-    # - At this stage, you should have both a map and ship initialised
-    # - Take in commands from user to navigate map and progress the game
-    # - You'll need to make frequent use of both your map and ship!
-    #   - Your ship stores (x, y): This is [y][x] on the map!
-    #   - When you find where the ship wants to move, call its interact()
-    #     method!
-    # - After each interaction, you'll need to check win/loss conditions
-    #   - Check if ship reached destination (remember ship stores this!)
-    #   - Check if ship has no health
-    #   - Check if ship has no fuel left
-    # ...
-    while True:
-        cmd=input("Enter (n,e,s,w | map | status): ").lower()
+            return
+        if fuel < 1:
+            print("Error: fuel too low")
+            return
+        if fuel > 99:
+            print("Error: fuel too high")
+            return
+        odyssey = Ship(self.ship_name, fuel)
+        odyssey.x, odyssey.y = 0, 0
+        odyssey.put_x, odyssey.put_y = 0, 0
+        self.odyssey = odyssey
+        print(odyssey)
+        print(">> SHIP SYSTEMS READY\n")
+        print(">>> EXECUTING LIFTOFF: EXITING Kepler-452b's ORBIT\n")
+        print('>>> AWAITING COMMANDS\n')
+        self.state = "play"
+
+    def _display_map(self):
+        # display_map prints row by row; collect its output and write the
+        # whole frame to the real stdout at once
+        size = self.size
+        cells = self.game_map.decode("latin-1")
+        frame = io.StringIO()
+        with contextlib.redirect_stdout(frame):
+            display_map([list(cells[start:start + size]) for start in range(0, size * size, size)])
+        sys.stdout.write(frame.getvalue())
+
+    def _end(self, message, glyph, outcome):
+        odyssey = self.odyssey
+        print(message)
+        self.game_map[odyssey.y * self.size + odyssey.x] = glyph
+        self._display_map()
+        print(f"\n>>> MISSION {outcome}")
+        self.state = "over"
+        self.finished = True
+
+    def _play(self, text):
+        # 3. Game Loop
+        # - Your ship stores (x, y): This is [y * size + x] on the map!
+        # - After each interaction, check win/loss conditions
+        game_map = self.game_map
+        odyssey = self.odyssey
+        cmd = text if text.islower() else text.lower() # islower() scans without allocating
         if cmd == "q":
-            print(f"{odyssey.name} has self-destructed.")
-            game_map[odyssey.y][odyssey.x] = "L"
-            display_map(game_map)
-            print("\n>>> MISSION FAILED")
-            break
-        elif cmd=="map":
-            display_map(game_map)
-        elif cmd =="status":
+            self._end(f"{odyssey.name} has self-destructed.", Glyph.WRECK, "FAILED")
+        elif cmd == "map":
+            self._display_map()
+        elif cmd == "status":
             print(odyssey)
-        elif cmd in ["n","e","s","w"]:
-            new_x,new_y=odyssey.x,odyssey.y
-            if cmd=="n":
-                new_y-=1
-            elif cmd=="e":
-                new_x+=1
-            elif cmd=="s":
-                new_y+=1
-            elif cmd=="w":
-                new_x-=1
-
-            if 0<=new_x<size and 0<=new_y<size:
-                target=game_map[new_y][new_x]
-                result=odyssey.interact(target, new_x, new_y)
-                if result:
-                    old_x, old_y = odyssey.x, odyssey.y
-                    game_map[old_y][old_x] = " "
+        elif cmd in _DELTAS:
+            # The ship's position is read once and written back once; only this
+            # method moves the ship
+            x, y = odyssey.x, odyssey.y
+            dx, dy = _DELTAS[cmd]
+            new_x, new_y = x + dx, y + dy
+            size = self.size
+            if 0 <= new_x < size > new_y >= 0: # Both coordinates in [0, size)
+                new_index = new_y * size + new_x
+                target = game_map[new_index]
+                if odyssey.interact(chr(target), new_x, new_y):
+                    game_map[y * size + x] = Glyph.EMPTY
                     odyssey.x, odyssey.y = new_x, new_y
-                    game_map[odyssey.y][odyssey.x] = "@"
-                    if target=="X":
-                        print(f"{odyssey.name} has reached: Sector 9-Delta")
-                        game_map[odyssey.y][odyssey.x] = "W"
-                        display_map(game_map)
-                        print("\n>>> MISSION COMPLETED")
-                        break
-                    elif odyssey.is_out_of_health():
-                        print(f"{odyssey.name} has fallen.")
-                        game_map[odyssey.y][odyssey.x]="L"
-                        display_map(game_map)
-                        print("\n>>> MISSION FAILED")
-                        break
-                    elif odyssey.is_out_of_fuel():
-                        print(f"{odyssey.name} is out of fuel.")
-                        game_map[odyssey.y][odyssey.x]="L"
-                        display_map(game_map)
-                        print("\n>>> MISSION FAILED")
-                        break
+                    game_map[new_index] = Glyph.SHIP
+                    match target:
+                        case Glyph.DESTINATION:
+                            self._end(f"{odyssey.name} has reached: Sector 9-Delta", Glyph.WIN, "COMPLETED")
+                        case _ if odyssey.is_out_of_health():
+                            self._end(f"{odyssey.name} has fallen.", Glyph.WRECK, "FAILED")
+                        case _ if odyssey.is_out_of_fuel():
+                            self._end(f"{odyssey.name} is out of fuel.", Glyph.WRECK, "FAILED")
             else:
                 print("Error: out of bounds")
         else:
             print("Error: unrecognised command")
+
+def _read_lines(prompts, lines):
+    '''
+    Reader thread for main(): input() for each prompt put on prompts.
+
+    Every line read is put on lines; None is put there once input ends.
+    '''
+    while True:
+        prompt = prompts.get()
+        try:
+            line = input(prompt)
+        except EOFError:
+            lines.put(None)
+            return
+        lines.put(line)
+
+def _install_completer(game):
+    '''
+    Enables tab completion of gameplay commands at the terminal prompt.
+
+    Does nothing where the readline module is unavailable (e.g. Windows).
+    '''
+    try:
+        import readline
+    except ImportError:
+        return
+
+    def complete(text, state):
+        if game.state != "play": # Ship names and numbers have nothing to complete
+            return None
+        matches = [command for command in _COMMANDS if command.startswith(text.lower())]
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(complete)
+    if "libedit" in (readline.__doc__ or ""): # macOS ships libedit, which binds differently
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+
+def main():
+    '''
+    Runs the entire program from start to end in the terminal.
+
+    Lines are read by a daemon thread and handed over through a queue, so
+    the game loop itself only ever waits on lines.get() and never sits in
+    input(). Each line goes to a GameController until the mission ends.
+    The next prompt is only sent once the previous line has been handled,
+    so it always matches the game's state.
+    '''
+    # readline switches the terminal to raw mode while the reader thread waits in
+    # input(); if the game ends mid-prompt (e.g. Ctrl-C) the thread never gets to
+    # switch it back, so save the settings here and restore them on the way out
+    try:
+        import termios
+    except ImportError: # Windows
+        termios = None
+    saved_tty = None
+    if termios is not None and sys.stdin is not None and sys.stdin.isatty():
+        with contextlib.suppress(termios.error):
+            saved_tty = termios.tcgetattr(sys.stdin)
+
+    prompts = queue.Queue()
+    lines = queue.Queue()
+    threading.Thread(target=_read_lines, args=(prompts, lines), daemon=True).start()
+
+    game = GameController()
+    _install_completer(game)
+    try:
+        game.start()
+        while not game.finished:
+            prompts.put(game.prompt())
+            line = lines.get()
+            if line is None: # Input closed before the mission ended
+                print()
+                break
+            game.on_command(line)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        if saved_tty is not None:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, saved_tty)
+
+def run_window():
+    '''
+    Runs the game in a Qt window instead of the terminal.
+
+    Commands are typed into a line edit and handled when Return is pressed,
+    from Qt's event loop, so nothing ever waits in input(). Lines arriving on
+    stdin (typed in the launching terminal, or piped in) are handled the same
+    way: a QSocketNotifier wakes the event loop when one is ready to read.
+    Output printed by the game is captured and appended to the log.
+    '''
+    from PySide6.QtCore import QSocketNotifier
+    from PySide6.QtWidgets import QApplication, QLabel, QLineEdit, QPlainTextEdit, QVBoxLayout, QWidget
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    game = GameController()
+
+    window = QWidget()
+    window.setWindowTitle("Space Exploration")
+    log = QPlainTextEdit()
+    log.setReadOnly(True)
+    log.setStyleSheet("font-family: monospace;")
+    prompt_label = QLabel()
+    command_edit = QLineEdit()
+    layout = QVBoxLayout(window)
+    layout.addWidget(log)
+    layout.addWidget(prompt_label)
+    layout.addWidget(command_edit)
+
+    # Qt can only watch real descriptors; Windows consoles are not sockets
+    stdin_notifier = None
+    if sys.stdin is not None and sys.platform != "win32":
+        stdin_notifier = QSocketNotifier(sys.stdin.fileno(), QSocketNotifier.Type.Read, window)
+
+    def run_step(step, *args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            step(*args)
+        if output.getvalue():
+            log.appendPlainText(output.getvalue().rstrip("\n"))
+        if game.finished:
+            prompt_label.setText("Mission over.")
+            command_edit.setEnabled(False)
+            if stdin_notifier is not None:
+                stdin_notifier.setEnabled(False)
+        else:
+            prompt_label.setText(game.prompt())
+
+    def submit(text):
+        log.appendPlainText(f"{game.prompt()}{text}")
+        run_step(game.on_command, text)
+
+    def on_return_pressed():
+        text = command_edit.text()
+        command_edit.clear()
+        submit(text)
+
+    # Read the descriptor directly: sys.stdin.readline() would buffer further lines
+    # that the notifier never reports, since they have already left the descriptor
+    pending = bytearray()
+
+    def on_stdin_ready():
+        data = os.read(stdin_notifier.socket(), 4096)
+        if not data: # End of input; stop watching or Qt keeps reporting it readable
+            stdin_notifier.setEnabled(False)
+            if pending and not game.finished: # Last line had no newline, as input() would accept
+                submit(pending.decode(errors="replace").rstrip("\r"))
+                pending.clear()
+            return
+        pending.extend(data)
+        while b"\n" in pending and not game.finished:
+            line, _, rest = pending.partition(b"\n")
+            pending[:] = rest
+            submit(line.decode(errors="replace").rstrip("\r"))
+
+    command_edit.returnPressed.connect(on_return_pressed)
+    if stdin_notifier is not None:
+        stdin_notifier.activated.connect(on_stdin_ready)
+    run_step(game.start)
+    window.resize(600, 500)
+    window.show()
+    command_edit.setFocus()
+    return app.exec()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    if "--window" in sys.argv[1:]:
+        sys.exit(run_window())
+    main()
@@ -0,0 +1,900 @@
+# Code structure extraction, text formatting and Graphviz output for the
+# Python Code Structure Visualizer. Nothing here depends on Qt, so the
+# extractor can be imported (or run from the command line) without loading the
+# GUI stack; Code-view.py builds the desktop app on top of it.
+
+import ast
+import os
+import sys
+import collections # For OrderedDict
+import contextlib
+import hashlib # For disk cache keys
+import io
+import pickle
+import time
+import threading # Split graphs render in parallel and share the render cache
+
+# --- AST Parsing Logic (Significantly Enhanced) ---
+# Marks where a class/function body ends on the traversal stack
+_LEAVE_SCOPE = object()
+# Scanner markers for "(...)" and "[...]" appended to the previous name. Objects,
+# not strings, so they can never collide with unparsed source such as [...]
+_CALL_SUFFIX = object()
+_SUBSCRIPT_SUFFIX = object()
+# Anything _get_full_name's scanner does not know (literals, operators, lambdas...)
+# is rendered with ast.unparse, which only exists on Python 3.9+
+_unparse = getattr(ast, 'unparse', None)
+# Expressions whose source needs no parentheses in front of .attr, (...) or [...]
+_ATOM_TYPES = (ast.Constant, ast.List, ast.Tuple, ast.Dict, ast.Set, ast.ListComp, ast.SetComp,
+               ast.DictComp, ast.GeneratorExp, ast.JoinedStr)
+
+# The extractor is deliberately plain Python. Its work is walking a tree of
+# heterogeneous ast node objects and building dicts and strings, which JITs like
+# Numba cannot compile (they only handle typed numeric arrays) and would only add
+# start-up time. Speed comes from avoiding work instead: the handler table,
+# skipped leaf types, memoized names, the class index and the parse caches.
+class CodeStructureExtractor:
+    def __init__(self):
+        self.structure = {
+            "module_name": None,
+            "global_variables": [],
+            "classes": [],
+            "functions": [],
+            "imports": {
+                "direct": set(),
+                "from": set()
+            },
+            "calls": {} # Source -> set of destination calls, filled in at the end of run()
+        }
+        self.current_scope = [] # Stack to track current function/class scope
+        self._scope_kinds = [] # Parallel to current_scope: "class" or "function"
+        self._classes_by_name = {} # Class name -> class_info, avoids scanning structure["classes"]
+        self._name_cache = {} # id(node) -> _get_full_name(node)
+        self._call_list = [] # (caller_id, callee_id) pairs in visit order
+
+    def _get_current_scope_id(self):
+        if self.current_scope:
+            return ".".join(self.current_scope)
+        return self.structure["module_name"] # Module level calls
+
+    def _current_class(self):
+        # The class_info whose body we are directly in, or None
+        if self._scope_kinds and self._scope_kinds[-1] == "class":
+            return self._classes_by_name.get(self.current_scope[-1])
+        return None
+
+    def _get_docstring(self, node):
+        # Raw docstring or None. ast.get_docstring would also run inspect.cleandoc,
+        # which is wasted work: only the first line is shown, and it gets stripped.
+        # Whitespace-only docstrings are None: they have no summary line to show
+        body = node.body
+        if body and isinstance(body[0], ast.Expr):
+            value = body[0].value
+            if isinstance(value, ast.Constant) and isinstance(value.value, str) and not value.value.isspace():
+                return value.value or None
+        return None
+
+    def _get_full_name(self, node):
+        # Keyed on id(node): the tree is alive for the whole walk, so ids are never reused
+        cached = self._name_cache.get(id(node))
+        if cached is not None:
+            return cached
+
+        # Scan a.b(...).c[...] chains outside-in in one loop instead of recursing
+        # per level, then stitch the parts together once
+        parts = []
+        current = node
+        while True:
+            if isinstance(current, ast.Attribute):
+                parts.append(current.attr)
+                current = current.value
+            elif isinstance(current, ast.Call):
+                parts.append(_CALL_SUFFIX)
+                current = current.func
+            elif isinstance(current, ast.Subscript):
+                if _unparse is not None: # Keep the index: dict[str, int], Optional[str]
+                    parts.append(_unparse(current))
+                    break
+                parts.append(_SUBSCRIPT_SUFFIX)
+                current = current.value
+            elif isinstance(current, ast.Name):
+                parts.append(current.id)
+                break
+            elif _unparse is not None:
+                text = _unparse(current)
+                if parts and not isinstance(current, _ATOM_TYPES):
+                    text = f"({text})" # (a + b).real, not a + b.real
+                parts.append(text)
+                break
+            else:
+                parts.append("<?>")
+                break
+
+        names = []
+        for part in reversed(parts):
+            if part is _CALL_SUFFIX:
+                names[-1] += "(...)"
+            elif part is _SUBSCRIPT_SUFFIX:
+                names[-1] += "[...]"
+            else:
+                names.append(part)
+        name = ".".join(names)
+
+        self._name_cache[id(node)] = name
+        return name
+
+    def visit_Module(self, node):
+        self.structure["module_name"] = "Module" # Default if not set later from filename
+
+    def visit_ClassDef(self, node):
+        class_info = {
+            "name": node.name,
+            "methods": [],
+            "bases": [self._get_full_name(base) for base in node.bases],
+            "docstring": self._get_docstring(node),
+            "attributes": [],
+            "decorators": [self._get_full_name(d) for d in node.decorator_list]
+        }
+        self.structure["classes"].append(class_info)
+        self._classes_by_name[node.name] = class_info
+
+        self.current_scope.append(node.name)
+        self._scope_kinds.append("class")
+        return True # Scope stays open until the class body has been walked
+
+    def visit_FunctionDef(self, node):
+        args_list = []
+        for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs:
+            arg_name = arg.arg
+            arg_annotation = ""
+            if arg.annotation:
+                arg_annotation = f": {self._get_full_name(arg.annotation)}"
+            args_list.append(f"{arg_name}{arg_annotation}")
+
+        # Add default values
+        for i, default in enumerate(node.args.defaults[::-1]):
+            args_list[len(args_list) - 1 - i] += f"={self._get_full_name(default)}"
+        
+        # Add keyword-only argument defaults
+        if node.args.kwonlyargs:
+            for i, default in enumerate(node.args.kw_defaults[::-1]):
+                if default:
+                    args_list[len(args_list) - len(node.args.kwonlyargs) - 1 - i] += f"={self._get_full_name(default)}"
+
+        return_annotation = ""
+        if node.returns:
+            return_annotation = f" -> {self._get_full_name(node.returns)}"
+
+        func_info = {
+            "name": node.name,
+            "args": args_list,
+            "docstring": self._get_docstring(node),
+            "return_annotation": return_annotation,
+            "decorators": [self._get_full_name(d) for d in node.decorator_list],
+            "calls_made": set() # Calls originating from this function/method
+        }
+
+        cls = self._current_class()
+        if cls is not None:
+            # This is a method
+            cls["methods"].append(func_info)
+        else:
+            # This is a global function
+            self.structure["functions"].append(func_info)
+        
+        self.current_scope.append(node.name)
+        self._scope_kinds.append("function")
+        return True
+
+    def visit_Assign(self, node):
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                var_info = {
+                    "name": target.id,
+                    "value": self._get_full_name(node.value)
+                }
+                if self.current_scope: # Assume it's an attribute if in a class scope
+                    cls = self._current_class()
+                    if cls is not None:
+                        cls["attributes"].append(var_info)
+                else: # Global variable
+                    self.structure["global_variables"].append(var_info)
+
+    def visit_AnnAssign(self, node):
+        if isinstance(node.target, ast.Name):
+            var_info = {
+                "name": node.target.id,
+                "annotation": self._get_full_name(node.annotation),
+                "value": self._get_full_name(node.value) if node.value else None
+            }
+            if self.current_scope:
+                cls = self._current_class()
+                if cls is not None:
+                    cls["attributes"].append(var_info)
+            else:
+                self.structure["global_variables"].append(var_info)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.structure["imports"]["direct"].add(alias.name)
+
+    def visit_ImportFrom(self, node):
+        module = node.module if node.module else ""
+        for alias in node.names:
+            self.structure["imports"]["from"].add(f"{module}.{alias.name}" if module else alias.name)
+
+    def visit_Call(self, node):
+        caller_id = self._get_current_scope_id()
+        callee_id = self._get_full_name(node.func)
+        self._call_list.append((caller_id, callee_id))
+    
+    # Basic control flow for graph labeling (can be expanded)
+    def visit_If(self, node):
+        caller_id = self._get_current_scope_id()
+        self._call_list.append((caller_id, f"Condition: {self._get_full_name(node.test)}"))
+    
+    def visit_For(self, node):
+        caller_id = self._get_current_scope_id()
+        self._call_list.append((caller_id, f"For Loop: {self._get_full_name(node.iter)}"))
+
+    def visit_While(self, node):
+        caller_id = self._get_current_scope_id()
+        self._call_list.append((caller_id, f"While Loop: {self._get_full_name(node.test)}"))
+
+    # Handlers are looked up by exact node type; a handler returning True has
+    # opened a scope that is closed once the node's children have been walked
+    _HANDLERS = {
+        ast.Module: visit_Module,
+        ast.ClassDef: visit_ClassDef,
+        ast.FunctionDef: visit_FunctionDef,
+        ast.Assign: visit_Assign,
+        ast.AnnAssign: visit_AnnAssign,
+        ast.Import: visit_Import,
+        ast.ImportFrom: visit_ImportFrom,
+        ast.Call: visit_Call,
+        ast.If: visit_If,
+        ast.For: visit_For,
+        ast.While: visit_While,
+    }
+
+    # Leaf types with no handler and no handled descendants (names, literals,
+    # contexts, operators, import aliases) make up a large share of every tree;
+    # they are never pushed onto the traversal stack at all
+    _SKIPPED_TYPES = frozenset({
+        ast.Name, ast.Constant, ast.alias, ast.Load, ast.Store, ast.Del,
+        *ast.operator.__subclasses__(), *ast.unaryop.__subclasses__(),
+        *ast.cmpop.__subclasses__(), *ast.boolop.__subclasses__(),
+    })
+
+    def run(self, tree):
+        # Iterative pre-order walk in the same order as ast.NodeVisitor, without
+        # a recursive visit()/generic_visit() call and getattr per node
+        get_handler = self._HANDLERS.get
+        skipped = self._SKIPPED_TYPES
+        iter_child_nodes = ast.iter_child_nodes
+        stack = [tree]
+        pop, push, extend = stack.pop, stack.append, stack.extend
+        while stack:
+            node = pop()
+            if node is _LEAVE_SCOPE:
+                self._scope_kinds.pop()
+                self.current_scope.pop()
+                continue
+            handler = get_handler(type(node))
+            if handler is not None and handler(self, node):
+                push(_LEAVE_SCOPE)
+            children = [child for child in iter_child_nodes(node) if type(child) not in skipped]
+            children.reverse() # Popped in source order
+            extend(children)
+
+        # Group the collected calls by caller in one pass
+        calls = self.structure["calls"]
+        for caller_id, callee_id in self._call_list:
+            callees = calls.get(caller_id)
+            if callees is None:
+                calls[caller_id] = {callee_id}
+            else:
+                callees.add(callee_id)
+        # Sorted once here (and cached with the structure) rather than on every format
+        self.structure["calls_sorted"] = {caller_id: tuple(sorted(callees)) for caller_id, callees in calls.items()}
+
+        # Per-walk scratch state: drop it so nothing outlives the tree. The
+        # id()-keyed name cache in particular must not be reused for another tree
+        self._name_cache.clear()
+        self._call_list.clear()
+        return self.structure
+
+# --- Parse Cache ---
+# Parsed structures keyed by (path, mtime, size): showing the text structure and
+# generating a graph for the same unchanged file only parses it once.
+PARSE_CACHE_SIZE = 32
+_parse_cache = collections.OrderedDict()
+
+def parse_python_file(filepath):
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None, f"Error: File does not exist '{filepath}'"
+    except OSError as e:
+        return None, f"Error: Could not read file '{filepath}': {e}"
+
+    cache_key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+    cached = _parse_cache.get(cache_key)
+    if cached is not None:
+        _parse_cache.move_to_end(cache_key)
+        return cached, None
+
+    structure, error = _parse_python_file_uncached(filepath)
+    if structure is not None:
+        _parse_cache[cache_key] = structure
+        if len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False) # Evict least recently used
+    return structure, error
+
+# --- Disk Cache ---
+# Structures are also pickled per user, keyed by a hash of the source, so a
+# restarted app skips parsing files it has already seen. Bump EXTRACTOR_VERSION
+# whenever CodeStructureExtractor's output changes; entries written by another
+# version are ignored. The directory is pruned whenever an entry is written:
+# entries unused for DISK_CACHE_MAX_AGE seconds go, then the least recently
+# used ones beyond DISK_CACHE_MAX_ENTRIES. Cache hits refresh an entry's mtime.
+EXTRACTOR_VERSION = "9"
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "code-view")
+DISK_CACHE_MAX_ENTRIES = 500
+DISK_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+
+def _structure_key(source_code, module_name):
+    return hashlib.sha1(f"{EXTRACTOR_VERSION}\0{module_name}\0{source_code}".encode("utf-8")).hexdigest()
+
+def _disk_cache_path(structure_key):
+    return os.path.join(CACHE_DIR, structure_key + ".pkl")
+
+def _load_cached_structure(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            version, structure = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception: # Truncated or foreign cache entry
+        version = None
+    if version != EXTRACTOR_VERSION: # Unusable, so don't keep it around
+        with contextlib.suppress(OSError):
+            os.remove(cache_path)
+        return None
+    with contextlib.suppress(OSError):
+        os.utime(cache_path) # Recently used, for _prune_disk_cache
+    return structure
+
+def _store_cached_structure(cache_path, structure):
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump((EXTRACTOR_VERSION, structure), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path) # Never leave a half-written entry behind
+    except (OSError, pickle.PicklingError):
+        return # Caching is best-effort; the parse itself succeeded
+    _prune_disk_cache()
+
+def _prune_disk_cache():
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            entries = [(entry.stat().st_mtime, entry.path) for entry in it
+                       if entry.name.endswith((".pkl", ".tmp")) and entry.is_file()]
+    except OSError:
+        return
+    entries.sort(reverse=True) # Most recently used first
+    oldest_allowed = time.time() - DISK_CACHE_MAX_AGE
+    for index, (mtime, path) in enumerate(entries):
+        if index >= DISK_CACHE_MAX_ENTRIES or mtime < oldest_allowed:
+            with contextlib.suppress(OSError): # Another instance may have removed it
+                os.remove(path)
+
+def _parse_python_file_uncached(filepath):
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            source_code = f.read()
+    except Exception as e:
+        return None, f"Error: Could not read file '{filepath}': {e}"
+
+    module_name = os.path.basename(filepath).replace(".py", "")
+    structure_key = _structure_key(source_code, module_name)
+    cache_path = _disk_cache_path(structure_key)
+    structure = _load_cached_structure(cache_path)
+    if structure is not None:
+        return structure, None
+
+    try:
+        tree = ast.parse(source_code)
+        extractor = CodeStructureExtractor()
+        extractor.structure["module_name"] = module_name
+        extractor.run(tree)
+        del tree # Free the AST now; only the extracted structure is kept and cached
+    except SyntaxError as e:
+        return None, f"Parsing error: File '{filepath}' contains syntax error: {e}"
+    except Exception as e:
+        return None, f"An unknown error occurred during parsing: {e}"
+
+    structure = extractor.structure
+    structure["source_hash"] = structure_key # Identifies the content for the graph caches
+    _store_cached_structure(cache_path, structure)
+    return structure, None
+
+def _docstring_summary(docstring):
+    # First line of a raw docstring, or "" when it has no text at all
+    lines = docstring.strip().splitlines() if docstring else None
+    return lines[0] if lines else ""
+
+def _write_variable(write, indent, var):
+    write(indent)
+    write(var['name'])
+    if var.get('annotation'):
+        write(": ")
+        write(var['annotation'])
+    if var['value'] is not None:
+        write(" = ")
+        write(var['value'])
+    write("\n")
+
+def _write_function(write, indent, func, calls):
+    for decorator in func['decorators']:
+        write(f"{indent}@{decorator}\n")
+    write(f"{indent}def {func['name']}(")
+    write(", ".join(func['args']))
+    write(f"){func['return_annotation']}\n")
+    summary = _docstring_summary(func['docstring'])
+    if summary:
+        write(f'{indent}  Doc: """{summary}"""\n')
+    if calls:
+        write(f"{indent}  Calls:\n")
+        for callee in calls:
+            write(f"{indent}    - {callee}\n")
+
+def format_structure_text(structure):
+    if not structure:
+        return "No code structure to display."
+
+    module_name = structure['module_name']
+    calls_sorted = structure["calls_sorted"]
+    # Everything goes through one buffer's bound write(); no per-line strings
+    # are collected and joined afterwards
+    buffer = io.StringIO()
+    write = buffer.write
+    write(f"--- Module: {module_name} ---\n")
+
+    if structure["imports"]["direct"] or structure["imports"]["from"]:
+        write("\n--- Imports ---\n")
+        for imp in sorted(structure["imports"]["direct"]):
+            write(f"  - import {imp}\n")
+        for imp_from in sorted(structure["imports"]["from"]):
+            parts = imp_from.split('.', 1)
+            if len(parts) > 1:
+                write(f"  - from {parts[0]} import {parts[1]}\n")
+            else:
+                write(f"  - from . import {parts[0]}\n")
+
+    if structure["global_variables"]:
+        write("\n--- Global Variables ---\n")
+        for var in structure["global_variables"]:
+            _write_variable(write, "  - ", var)
+
+    if structure["functions"]:
+        write("\n--- Global Functions ---\n")
+        for func in structure["functions"]:
+            _write_function(write, "  ", func, calls_sorted.get(f"{module_name}.{func['name']}"))
+
+    if structure["classes"]:
+        write("\n--- Classes ---\n")
+        for cls in structure["classes"]:
+            for decorator in cls['decorators']:
+                write(f"  @{decorator}\n")
+            write(f"  class {cls['name']}")
+            if cls['bases']:
+                write("(")
+                write(", ".join(cls['bases']))
+                write(")")
+            write(":\n")
+            summary = _docstring_summary(cls['docstring'])
+            if summary:
+                write(f'    Doc: """{summary}"""\n')
+
+            if cls["attributes"]:
+                write("    --- Class Attributes ---\n")
+                for attr in cls["attributes"]:
+                    _write_variable(write, "    - ", attr)
+
+            if cls["methods"]:
+                write("    --- Methods ---\n")
+                class_prefix = f"{module_name}.{cls['name']}."
+                for method in cls["methods"]:
+                    _write_function(write, "      ", method, calls_sorted.get(class_prefix + method['name']))
+    
+    # Module-level calls (e.g., direct calls outside functions/classes)
+    callees = calls_sorted.get(module_name)
+    if callees:
+        write("\n--- Module-Level Calls ---\n")
+        for callee in callees:
+            write(f"  - {callee}\n")
+
+    return buffer.getvalue()[:-1] # Drop the final newline
+
+# --- DOT Output ---
+# Graphs are written as DOT text directly: every statement is formatted once and
+# the lines are joined at the end, avoiding graphviz.Digraph's per-call quoting
+# and attribute merging, which dominated generation time on large modules.
+def _dot_quote(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+def _dot_attrs(attrs):
+    if not attrs:
+        return ""
+    return " [" + " ".join(f"{key}={_dot_quote(value)}" for key, value in attrs.items()) + "]"
+
+class DotBuilder:
+    def __init__(self, name="", kind="digraph", comment=None, graph_attr=None, node_attr=None, edge_attr=None):
+        self.kind = kind
+        self.name = name
+        self.comment = comment
+        self._lines = []
+        if graph_attr:
+            self._lines.append(f"graph{_dot_attrs(graph_attr)}")
+        if node_attr:
+            self._lines.append(f"node{_dot_attrs(node_attr)}")
+        if edge_attr:
+            self._lines.append(f"edge{_dot_attrs(edge_attr)}")
+
+    def attr(self, **attrs):
+        self._lines.append(f"graph{_dot_attrs(attrs)}")
+
+    def node(self, node_id, label=None, **attrs):
+        if label is not None:
+            attrs = {"label": label, **attrs}
+        self._lines.append(f"{_dot_quote(node_id)}{_dot_attrs(attrs)}")
+
+    def edge(self, tail_id, head_id, **attrs):
+        self._lines.append(f"{_dot_quote(tail_id)} -> {_dot_quote(head_id)}{_dot_attrs(attrs)}")
+
+    @contextlib.contextmanager
+    def subgraph(self, name):
+        sub = DotBuilder(name=name, kind="subgraph")
+        yield sub
+        self._lines.append(sub.source())
+
+    def source(self):
+        header = f"{self.kind} {_dot_quote(self.name)} {{" if self.name else f"{self.kind} {{"
+        lines = [f"// {self.comment}"] if self.comment else []
+        lines.append(header)
+        lines.extend("\t" + line.replace("\n", "\n\t") for line in self._lines)
+        lines.append("}")
+        return "\n".join(lines)
+
+# Rendered output keyed by (sha1 of the DOT source, format): saving the same
+# graph again, or under another name, only rewrites the file without running dot.
+# Bounded by total size rather than entry count, since a split module renders an
+# overview plus one graph per class and all of them should stay cached together
+RENDER_CACHE_BYTES = 64 * 1024 * 1024
+_render_cache = collections.OrderedDict()
+_render_cache_lock = threading.Lock()
+
+def _run_dot(dot_source, format):
+    # Pipes the DOT source to the dot executable and returns the rendered bytes;
+    # nothing is written to disk until _render_dot saves the result
+    import subprocess # Only needed once a graph is actually rendered
+    try:
+        return subprocess.run(["dot", f"-T{format}"], input=dot_source.encode("utf-8"), check=True, capture_output=True).stdout, None
+    except FileNotFoundError:
+        return None, "Error: Graphviz executable (dot) not found. Please ensure Graphviz is installed and added to your system's PATH."
+    except subprocess.CalledProcessError as e:
+        return None, f"Error generating graph: {e.stderr.decode(errors='replace').strip() or e}"
+    except Exception as e:
+        return None, f"Error generating graph: {e}"
+
+def _render_dot(dot_source, base_path, format):
+    render_key = (hashlib.sha1(dot_source.encode("utf-8")).hexdigest(), format)
+    with _render_cache_lock:
+        rendered = _render_cache.get(render_key)
+        if rendered is not None:
+            _render_cache.move_to_end(render_key)
+    if rendered is None:
+        rendered, error = _run_dot(dot_source, format)
+        if error:
+            return None, error
+        with _render_cache_lock:
+            _render_cache[render_key] = rendered
+            cached_bytes = sum(len(data) for data in _render_cache.values())
+            while cached_bytes > RENDER_CACHE_BYTES:
+                cached_bytes -= len(_render_cache.popitem(last=False)[1]) # Evict least recently used
+
+    output_path = f"{base_path}.{format}"
+    try:
+        with open(output_path, "wb") as f:
+            f.write(rendered)
+    except OSError as e:
+        return None, f"Error generating graph: {e}"
+    return output_path, f"Visualization graph saved to: {output_path}"
+
+def _new_graph(structure, splines='true'):
+    return DotBuilder(
+        comment=f'Code Structure of {structure["module_name"]}',
+        graph_attr={
+            'rankdir': 'LR', # Left to Right
+            'overlap': 'false',
+            'splines': splines,
+            'concentrate': 'true', # Merge parallel edges instead of routing each one
+            'bgcolor': 'transparent'
+        },
+        node_attr={
+            'fontsize': '10',
+            'fontname': 'Helvetica',
+            'shape': 'box',
+            'style': 'filled'
+        },
+        edge_attr={'fontsize': '8', 'fontname': 'Helvetica'}
+    )
+
+# DOT sources keyed by (structure source_hash, splines), so switching the output
+# format or re-saving an unchanged file skips building the graph again.
+# Entries are (dot_source, merged_edges, node_count) as returned by build_dot_source
+DOT_CACHE_SIZE = 64
+_dot_source_cache = collections.OrderedDict()
+
+def build_dot_source(structure, splines='true'):
+    cache_key = (structure.get("source_hash"), splines)
+    if cache_key[0] is None: # Hand-built structure, nothing to key the cache on
+        return _build_dot_source_uncached(structure, splines)
+
+    result = _dot_source_cache.get(cache_key)
+    if result is None:
+        result = _build_dot_source_uncached(structure, splines)
+        _dot_source_cache[cache_key] = result
+        if len(_dot_source_cache) > DOT_CACHE_SIZE:
+            _dot_source_cache.popitem(last=False)
+    else:
+        _dot_source_cache.move_to_end(cache_key)
+    return result
+
+def _build_dot_source_uncached(structure, splines):
+    dot = _new_graph(structure, splines)
+
+    # Use a set to keep track of added nodes to avoid duplicates and simplify call connections
+    all_nodes = set()
+    # Name -> graph ID for everything defined in this module ("func", "Class",
+    # "Class.member"), plus bare member names -> ID in the first class defining
+    # them, so each call edge resolves with a single dict lookup. Functions,
+    # classes and qualified names are assigned; bare member names only fill gaps
+    name_to_id = {}
+    
+    # Module Cluster
+    with dot.subgraph(f'cluster_module_{structure["module_name"]}') as c:
+        c.attr(label=f'Module: {structure["module_name"]}', color='blue', style='rounded,filled', fillcolor='#E0FFFF')
+        module_id = f"module_{structure['module_name']}"
+        c.node(module_id, f'Module: {structure["module_name"]}', shape='folder', style='filled', fillcolor='#ADD8E6')
+        all_nodes.add(module_id)
+
+        # Global Variables
+        if structure["global_variables"]:
+            gv_node_id = f"{module_id}_globals"
+            c.node(gv_node_id, "Global Variables", shape='note', style='filled', fillcolor='grey', fontcolor='white')
+            c.edge(module_id, gv_node_id, label='defines')
+            all_nodes.add(gv_node_id)
+
+
+        # Global Functions
+        for func in structure["functions"]:
+            func_label = f"Function: {func['name']}(\n{', '.join(func['args'])}){func['return_annotation']}"
+            if func['decorators']:
+                func_label = f"Decorators: {', '.join(func['decorators'])}\n" + func_label
+            func_id = f"{module_id}.{func['name']}"
+            c.node(func_id, func_label, shape='ellipse', style='filled', fillcolor='#90EE90') # Light Green
+            c.edge(module_id, func_id, label='contains')
+            all_nodes.add(func_id)
+            name_to_id[func['name']] = func_id
+
+    # Classes Subgraphs
+    for cls in structure["classes"]:
+        class_id = f"{module_id}.{cls['name']}"
+        with dot.subgraph(f'cluster_class_{cls["name"]}') as c_cls:
+            bases_str = f"({', '.join(cls['bases'])})" if cls['bases'] else ""
+            decorators_str = f"Decorators: {', '.join(cls['decorators'])}\n" if cls['decorators'] else ""
+            c_cls.attr(label=f'{decorators_str}Class: {cls["name"]}{bases_str}', color='darkgreen', style='rounded,filled', fillcolor='#FFFACD') # Lemon Chiffon
+            
+            c_cls.node(class_id, f'Class: {cls["name"]}{bases_str}', shape='component', style='filled', fillcolor='#FFD700') # Gold
+            all_nodes.add(class_id)
+            name_to_id[cls['name']] = class_id
+            dot.edge(module_id, class_id, label='contains') # Link class to module
+
+            # Class Attributes
+            for attr in cls["attributes"]:
+                attr_label = f"Attribute: {attr['name']}"
+                if 'annotation' in attr and attr['annotation']:
+                    attr_label += f": {attr['annotation']}"
+                if attr['value'] is not None:
+                    attr_label += f" = {attr['value']}"
+                attr_id = f"{class_id}.{attr['name']}"
+                c_cls.node(attr_id, attr_label, shape='rectangle', style='filled', fillcolor='#D3D3D3') # Light Gray
+                c_cls.edge(class_id, attr_id, label='has attribute')
+                all_nodes.add(attr_id)
+                name_to_id[f"{cls['name']}.{attr['name']}"] = attr_id
+                name_to_id.setdefault(attr['name'], attr_id)
+
+            # Methods
+            for method in cls["methods"]:
+                method_id = f"{class_id}.{method['name']}"
+                method_label = f"Method: {method['name']}(\n{', '.join(method['args'])}){method['return_annotation']}"
+                if method['decorators']:
+                    method_label = f"Decorators: {', '.join(method['decorators'])}\n" + method_label
+                c_cls.node(method_id, method_label, shape='octagon', style='filled', fillcolor='#FFB6C1') # Light Pink
+                c_cls.edge(class_id, method_id, label='contains method')
+                all_nodes.add(method_id)
+                name_to_id[f"{cls['name']}.{method['name']}"] = method_id
+                name_to_id.setdefault(method['name'], method_id)
+
+    # --- Add all recognized nodes to the graph even if they are just targets of a call ---
+    # This helps when drawing edges to external/imported entities
+    # Note: this might create "floating" nodes for unparsed external calls
+    for caller, callees in structure["calls"].items():
+        for callee in callees:
+            if callee not in all_nodes:
+                # Add a generic node for external calls or unparsed elements
+                dot.node(callee, callee, shape='box', style='dashed', color='gray', fillcolor='white')
+                all_nodes.add(callee)
+    
+    # --- Add Call Edges ---
+    # Important: Ensure both source and target nodes exist before adding an edge
+    # Different raw callees ("helper", "Cls.helper") can resolve to the same node,
+    # so each (caller, callee) edge is only emitted once
+    module_prefix = f"{module_id}."
+    emitted_edges = set()
+    merged_edges = 0
+    for caller_raw, callees_raw in structure["calls"].items():
+        # Determine the full ID of the caller within the graph context
+        if caller_raw == structure['module_name']: # Module-level calls
+            caller_id = module_id
+        elif caller_raw.count('.') < 3: # Function, method or nested function
+            caller_id = module_prefix + caller_raw
+        else:
+            caller_id = ""
+
+        if caller_id not in all_nodes:
+            dot.node(caller_id, caller_raw, shape='box', style='dashed', color='red', fillcolor='white') # Indicate missing source for debugging
+            all_nodes.add(caller_id)
+            if caller_id:
+                name_to_id[caller_raw] = caller_id
+        
+        for callee in callees_raw:
+            # Determine the full ID of the callee (could be internal or external)
+            # Known internal functions, classes and class members resolve to their node;
+            # anything else keeps the raw name for external calls
+            # This is a heuristic and might need more robust lookup for complex structures
+            callee_id = name_to_id.get(callee, callee)
+            
+            if caller_id and callee_id and caller_id != callee_id: # Avoid self-loops for now
+                edge = (caller_id, callee_id)
+                if edge in emitted_edges:
+                    merged_edges += 1
+                    continue
+                emitted_edges.add(edge)
+                dot.edge(caller_id, callee_id, label='calls', color='purple')
+
+    # Add inheritance edges explicitly (already done within class subgraph, but reinforcing direct link for clarity)
+    for cls in structure["classes"]:
+        class_id = module_prefix + cls['name']
+        for base in cls['bases']:
+            base_id = module_prefix + base # Assume base is in current module for now
+            if base_id not in all_nodes: # If base class not defined in current module, add it as a generic node
+                dot.node(base_id, base, shape='box', style='dashed', color='grey', fillcolor='white')
+                all_nodes.add(base_id)
+            dot.edge(base_id, class_id, style='dashed', arrowhead='empty', label='inherits')
+
+
+    return dot.source(), merged_edges, len(all_nodes)
+
+# --- Large Graphs ---
+# dot's layout time grows much faster than the node count and it can hang on
+# modules with many hundreds of nodes. The count is taken from the built graph,
+# so call targets, conditions, loops and bases count as well as definitions.
+# Above max_nodes the module is split into
+# an overview of its functions and classes plus one detail graph per class,
+# rendered in parallel. Each dot run is a separate process, so threads suffice.
+MAX_GRAPH_NODES = 200
+
+def _partial_structure(structure, part, functions, classes, include_module_calls):
+    # A copy of structure limited to the given definitions and the calls they make
+    owners = {func["name"] for func in functions} | {cls["name"] for cls in classes}
+    calls = {caller: callees for caller, callees in structure["calls"].items()
+             if caller.split('.', 1)[0] in owners or (include_module_calls and caller == structure["module_name"])}
+    source_hash = structure.get("source_hash")
+    return dict(structure, global_variables=[], functions=functions, classes=classes, calls=calls,
+                source_hash=f"{source_hash}/{part}" if source_hash else None)
+
+def _build_overview_dot_source(structure, detail_links):
+    dot = _new_graph(structure, splines='line')
+    module_id = f"module_{structure['module_name']}"
+    dot.node(module_id, f'Module: {structure["module_name"]}', shape='folder', style='filled', fillcolor='#ADD8E6')
+
+    if structure["functions"]:
+        functions_id = f"{module_id}._functions"
+        dot.node(functions_id, f"Functions ({len(structure['functions'])})", shape='ellipse', style='filled', fillcolor='#90EE90',
+                 URL=detail_links["functions"], tooltip="Open the functions graph")
+        dot.edge(module_id, functions_id, label='contains')
+
+    for cls in structure["classes"]:
+        class_id = f"{module_id}.{cls['name']}"
+        bases_str = f"({', '.join(cls['bases'])})" if cls['bases'] else ""
+        dot.node(class_id, f"Class: {cls['name']}{bases_str}\n{len(cls['methods'])} methods, {len(cls['attributes'])} attributes",
+                 shape='component', style='filled', fillcolor='#FFD700', URL=detail_links[cls['name']], tooltip="Open the class graph")
+        dot.edge(module_id, class_id, label='contains')
+
+    class_names = {cls['name'] for cls in structure["classes"]}
+    for cls in structure["classes"]:
+        for base in cls['bases']:
+            if base in class_names: # Only inheritance within the module; details show the rest
+                dot.edge(f"{module_id}.{base}", f"{module_id}.{cls['name']}", style='dashed', arrowhead='empty', label='inherits')
+    return dot.source()
+
+def _generate_split_graphs(structure, base_path, format, node_count, max_nodes):
+    jobs = {} # Output base path -> DOT source
+    detail_links = {}
+    if structure["functions"]:
+        detail_base = f"{base_path}_functions"
+        jobs[detail_base] = build_dot_source(_partial_structure(structure, "functions", structure["functions"], [], True), splines='line')[0]
+        detail_links["functions"] = os.path.basename(f"{detail_base}.{format}")
+    for cls in structure["classes"]:
+        detail_base = f"{base_path}_class_{cls['name']}"
+        jobs[detail_base] = build_dot_source(_partial_structure(structure, f"class_{cls['name']}", [], [cls], False), splines='line')[0]
+        detail_links[cls['name']] = os.path.basename(f"{detail_base}.{format}")
+    jobs = {base_path: _build_overview_dot_source(structure, detail_links), **jobs}
+
+    import concurrent.futures
+    with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        results = list(pool.map(lambda job: _render_dot(job[1], job[0], format), jobs.items()))
+
+    overview_path, overview_message = results[0]
+    if not overview_path:
+        return None, overview_message
+    failed = [message for path, message in results[1:] if not path]
+    message = (f"Module has {node_count} nodes (limit {max_nodes}), so it was split. "
+               f"Overview graph saved to: {overview_path} with {len(results) - 1 - len(failed)} detail graphs alongside it.")
+    if failed:
+        message += f" {len(failed)} detail graphs failed: {failed[0]}"
+    return overview_path, message
+
+def generate_graph_visualization(structure, output_filepath, format="png", max_nodes=MAX_GRAPH_NODES):
+    if not structure:
+        return None, "No graph can be generated."
+
+    base_path = os.path.splitext(output_filepath)[0]
+    dot_source, merged_edges, node_count = build_dot_source(structure)
+    if max_nodes and node_count > max_nodes:
+        return _generate_split_graphs(structure, base_path, format, node_count, max_nodes)
+    output_path, message = _render_dot(dot_source, base_path, format)
+    if output_path and merged_edges:
+        message += f" ({merged_edges} duplicate call edges merged)"
+    return output_path, message
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Print the structure of a Python file, optionally rendering it with Graphviz.")
+    parser.add_argument("filepath", help="Python file to analyse")
+    parser.add_argument("--graph", metavar="OUTPUT", help="also render a graph to OUTPUT")
+    parser.add_argument("--format", default="png", choices=["png", "svg", "pdf", "dot"], help="graph format (default: png)")
+    parser.add_argument("--max-nodes", type=int, default=MAX_GRAPH_NODES,
+                        help=f"split graphs with more nodes than this; 0 disables splitting (default: {MAX_GRAPH_NODES})")
+    args = parser.parse_args(argv)
+
+    structure, error = parse_python_file(args.filepath)
+    if not structure:
+        print(error, file=sys.stderr)
+        return 1
+    print(format_structure_text(structure))
+
+    if args.graph:
+        full_path, message = generate_graph_visualization(structure, args.graph, args.format, args.max_nodes)
+        print(message, file=sys.stdout if full_path else sys.stderr)
+        if not full_path:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())